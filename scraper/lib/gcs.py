@@ -1,8 +1,15 @@
 # lib/gcs.py
 from google.cloud import storage
+from google.api_core.exceptions import NotFound, PreconditionFailed
+import google.auth
+from google.auth.transport.requests import Request
 import json
 import logging
-from typing import Any, Optional
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from lib.ndjson import CONTENT_TYPE as NDJSON_CONTENT_TYPE, is_gzipped, is_ndjson, iter_records, write_records
 
 logger = logging.getLogger("gcs")
 
@@ -15,12 +22,165 @@ def upload_json(bucket_name: str, blob_name: str, data: Any, content_type: str =
     logger.info(f"Uploaded to gs://{bucket_name}/{blob_name}")
     return True
 
-def download_json(bucket_name: str, blob_name: str) -> Optional[Any]:
+def download_json(bucket_name: str, blob_name: str, missing_ok: bool = False) -> Optional[Any]:
     client = storage.Client()
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(blob_name)
     if not blob.exists():
-        logger.error(f"Blob not found: gs://{bucket_name}/{blob_name}")
+        if not missing_ok:
+            logger.error(f"Blob not found: gs://{bucket_name}/{blob_name}")
         return None
     raw = blob.download_as_text()
     return json.loads(raw)
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+def upload_ndjson(bucket_name: str, blob_name: str, records: Iterable[Any]) -> int:
+    """Stream records to a *.ndjson[.gz] blob via a resumable upload. Returns the record count."""
+    client = storage.Client()
+    blob = client.bucket(bucket_name).blob(blob_name, chunk_size=STREAM_CHUNK_SIZE)
+    # ignore_flush: GzipFile may flush mid-stream, which a resumable BlobWriter rejects
+    with blob.open("wb", ignore_flush=True, content_type=NDJSON_CONTENT_TYPE) as f:
+        count = write_records(f, records, gzipped=is_gzipped(blob_name))
+    logger.info(f"Uploaded {count} records to gs://{bucket_name}/{blob_name}")
+    return count
+
+def iter_ndjson(bucket_name: str, blob_name: str) -> Iterator[Any]:
+    client = storage.Client()
+    blob = client.bucket(bucket_name).blob(blob_name)
+    with blob.open("rb", chunk_size=STREAM_CHUNK_SIZE) as f:
+        yield from iter_records(f, gzipped=is_gzipped(blob_name))
+
+def upload_schedule(bucket_name: str, blob_name: str, records: Iterable[Any]) -> int:
+    """Upload a schedule in the format implied by the blob name (*.json or *.ndjson[.gz])."""
+    if is_ndjson(blob_name):
+        return upload_ndjson(bucket_name, blob_name, records)
+    data = list(records)
+    upload_json(bucket_name, blob_name, data)
+    return len(data)
+
+def iter_schedule(bucket_name: str, blob_name: str) -> Optional[Iterator[Any]]:
+    """
+    Iterate the shift records of a schedule blob in either format; None if it is missing.
+    NDJSON blobs are streamed record by record; plain JSON is read whole as before.
+    """
+    if not is_ndjson(blob_name):
+        data = download_json(bucket_name, blob_name)
+        return None if data is None else iter(data)
+    client = storage.Client()
+    if not client.bucket(bucket_name).blob(blob_name).exists():
+        logger.error(f"Blob not found: gs://{bucket_name}/{blob_name}")
+        return None
+    return iter_ndjson(bucket_name, blob_name)
+
+def get_metadata(bucket_name: str, blob_name: str) -> Optional[Dict[str, str]]:
+    """Custom metadata of a blob, or None if it does not exist."""
+    client = storage.Client()
+    blob = client.bucket(bucket_name).get_blob(blob_name)
+    if blob is None:
+        return None
+    return blob.metadata or {}
+
+def upload_text(bucket_name: str, blob_name: str, text: str, content_type: str = "text/plain",
+                metadata: Optional[Dict[str, str]] = None, cache_control: Optional[str] = None,
+                predefined_acl: Optional[str] = None) -> bool:
+    client = storage.Client()
+    bucket = client.bucket(bucket_name)
+    blob = bucket.blob(blob_name)
+    blob.metadata = metadata
+    blob.cache_control = cache_control
+    blob.upload_from_string(text, content_type=content_type, predefined_acl=predefined_acl)
+    logger.info(f"Uploaded to gs://{bucket_name}/{blob_name}")
+    return True
+
+def public_url(bucket_name: str, blob_name: str) -> str:
+    return f"https://storage.googleapis.com/{bucket_name}/{quote(blob_name)}"
+
+def authenticated_url(bucket_name: str, blob_name: str) -> str:
+    """Stable url for a private object; readers sign in with a Google account that has read access."""
+    return f"https://storage.cloud.google.com/{bucket_name}/{quote(blob_name)}"
+
+# V4 signed urls cannot outlive 7 days.
+MAX_SIGNED_URL_EXPIRATION = timedelta(days=7)
+
+def signed_url(bucket_name: str, blob_name: str, expiration: timedelta = MAX_SIGNED_URL_EXPIRATION) -> Optional[str]:
+    """
+    V4 signed GET url, valid for `expiration` (capped at 7 days) and different on every
+    call. On Cloud Run the default credentials cannot sign locally, so the service account
+    email + access token are passed to sign through the IAM API.
+    """
+    expiration = min(expiration, MAX_SIGNED_URL_EXPIRATION)
+    client = storage.Client()
+    blob = client.bucket(bucket_name).blob(blob_name)
+    try:
+        credentials, _ = google.auth.default()
+        credentials.refresh(Request())
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=expiration,
+            method="GET",
+            service_account_email=getattr(credentials, "service_account_email", None),
+            access_token=credentials.token,
+        )
+    except Exception:
+        logger.exception(f"Failed to sign url for gs://{bucket_name}/{blob_name}")
+        return None
+
+def get_generation(bucket_name: str, blob_name: str) -> Optional[int]:
+    client = storage.Client()
+    blob = client.bucket(bucket_name).get_blob(blob_name)
+    return blob.generation if blob else None
+
+def read_json_generation(bucket_name: str, blob_name: str) -> Tuple[Optional[Any], int]:
+    """(data, generation) of a JSON blob; (None, 0) if it does not exist."""
+    client = storage.Client()
+    bucket = client.bucket(bucket_name)
+    while True:
+        blob = bucket.get_blob(blob_name)
+        if blob is None:
+            return None, 0
+        try:
+            raw = blob.download_as_text(if_generation_match=blob.generation)
+        except (NotFound, PreconditionFailed):
+            # Replaced or deleted between the metadata read and the download
+            continue
+        return json.loads(raw), blob.generation
+
+def write_json_if_generation(bucket_name: str, blob_name: str, data: Any, generation: int) -> Optional[int]:
+    """
+    Write only if the blob is still at `generation` (0 = must not exist).
+    Returns the new generation, or None if someone else wrote first.
+    """
+    client = storage.Client()
+    blob = client.bucket(bucket_name).blob(blob_name)
+    try:
+        blob.upload_from_string(json.dumps(data), content_type="application/json", if_generation_match=generation)
+    except PreconditionFailed:
+        return None
+    return blob.generation
+
+def delete_if_generation(bucket_name: str, blob_name: str, generation: int) -> bool:
+    client = storage.Client()
+    blob = client.bucket(bucket_name).blob(blob_name)
+    try:
+        blob.delete(if_generation_match=generation)
+    except NotFound:
+        return True
+    except PreconditionFailed:
+        return False
+    return True
+
+def delete_blob(bucket_name: str, blob_name: str) -> bool:
+    client = storage.Client()
+    try:
+        client.bucket(bucket_name).blob(blob_name).delete()
+    except NotFound:
+        pass
+    logger.info(f"Deleted gs://{bucket_name}/{blob_name}")
+    return True
+
+def list_blob_names(bucket_name: str, prefix: str, start_offset: Optional[str] = None,
+                    end_offset: Optional[str] = None) -> List[str]:
+    client = storage.Client()
+    return [b.name for b in client.list_blobs(bucket_name, prefix=prefix, start_offset=start_offset,
+                                              end_offset=end_offset)]
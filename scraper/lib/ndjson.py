@@ -0,0 +1,44 @@
+# lib/ndjson.py
+"""
+Newline-delimited JSON schedule format: one shift object per line, optionally gzipped
+(*.ndjson / *.ndjson.gz). Readers and writers work on file objects so records stream
+through without holding the raw text or the whole parsed list in memory.
+"""
+import gzip
+import io
+import json
+from typing import Any, BinaryIO, Iterable, Iterator
+
+NDJSON_SUFFIXES = (".ndjson", ".ndjson.gz")
+CONTENT_TYPE = "application/x-ndjson"
+
+
+def is_ndjson(name: str) -> bool:
+    return name.endswith(NDJSON_SUFFIXES)
+
+
+def is_gzipped(name: str) -> bool:
+    return name.endswith(".gz")
+
+
+def write_records(fileobj: BinaryIO, records: Iterable[Any], gzipped: bool = False) -> int:
+    """Write records one per line to a binary file object. Returns the record count."""
+    count = 0
+    stream = gzip.GzipFile(fileobj=fileobj, mode="wb") if gzipped else fileobj
+    try:
+        for record in records:
+            stream.write(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+            stream.write(b"\n")
+            count += 1
+    finally:
+        if gzipped:
+            stream.close()  # flushes the gzip trailer; leaves fileobj open
+    return count
+
+
+def iter_records(fileobj: BinaryIO, gzipped: bool = False) -> Iterator[Any]:
+    """Yield records from a binary file object, one line at a time. Blank lines are skipped."""
+    raw = gzip.GzipFile(fileobj=fileobj, mode="rb") if gzipped else fileobj
+    for line in io.TextIOWrapper(raw, encoding="utf-8"):
+        if line.strip():
+            yield json.loads(line)
@@ -6,6 +6,9 @@ Inputs:
   --date YYYY-MM-DD (optional; default: today)
   --bucket BUCKET_NAME (required or env BUCKET_NAME)
   --secret KROWD_SECRET_ID (Secret Manager secret id containing {"username":"...","password":"..."})
+  --tenants gs://bucket/tenants.json (optional; multi-tenant mode, sharded over
+    CLOUD_RUN_TASK_INDEX/CLOUD_RUN_TASK_COUNT; writes tenants/<id>/single/YYYY/MM/DD/...
+    and results/<run_id>/scraper/shard-*.json)
 Outputs:
   prints JSON with {"status":"success","gcs_path":"gs://..."} on success
 """
@@ -15,12 +18,15 @@ import json
 import logging
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, UTC
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
-from lib.krowd_scraper import krowd_login, get_krowd_schedule
-from lib.gcs import upload_json
+from lib.krowd_scraper import close_driver, krowd_login, get_krowd_schedule, open_login_page
+from lib.gcs import upload_schedule
 from lib.secrets import get_secret
+from lib.tenants import parse_gcs_path, run_shard
 
 logger = logging.getLogger("scraper")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -34,23 +40,126 @@ def parse_args():
     p.add_argument("--headless", action="store_true", default=True, help="Run Chrome headless")
     p.add_argument(
         "--gcs_path",
-        help="Optional explicit GS path (gs://bucket/single/YYYY/MM/DD/schedule-<ts>.json). Overrides bucket/date/timestamp.",
+        help="Optional explicit GS path (gs://bucket/single/YYYY/MM/DD/schedule-<ts>.json). Overrides bucket/date/timestamp/format.",
         default=None,
     )
+    p.add_argument("--format", choices=["json", "ndjson", "ndjson.gz"], help="Schedule file format (ndjson is streamed)", default=os.getenv("SCHEDULE_FORMAT", "json"))
+    p.add_argument("--tenants", help="gs:// path to a tenant manifest (multi-tenant mode)", default=os.getenv("TENANTS_MANIFEST"))
+    p.add_argument("--run_id", help="Id grouping shard results of one workflow run", default=os.getenv("RUN_ID"))
+    p.add_argument("--concurrency", type=int, help="Tenants scraped in parallel per task (one Chromium each)", default=int(os.getenv("TENANT_CONCURRENCY", "2")))
+    p.add_argument("--dry_run", action="store_true", help="Print this task's tenant shard and exit")
     return p.parse_args()
 
 
+def _error(msg: str) -> Dict[str, Any]:
+    logger.critical(msg)
+    return {"status": "error", "error": msg}
+
+
+def schedule_blob_name(date_str: str, root: str = "single/", fmt: str = "json") -> str:
+    date_path = datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y/%m/%d")
+    timestamp_str = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+    return f"{root}{date_path}/schedule-{timestamp_str}.{fmt}"
+
+
+def _timed(fn, *args, **kwargs) -> Tuple[Any, float]:
+    began = time.monotonic()
+    return fn(*args, **kwargs), time.monotonic() - began
+
+
+def _discard_browser(future) -> None:
+    if not future.exception():
+        close_driver(future.result()[0])
+
+
+def scrape_to_gcs(secret_value: str, bucket: str, blob_name: str, headless: bool = True) -> Dict[str, Any]:
+    """Log into Krowd with the given secret, fetch the schedule and upload it. Returns the JSON-able result."""
+    # Launch Chromium and load the login page while the secret is being fetched
+    began = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chromium")
+    browser = pool.submit(_timed, open_login_page, headless=headless)
+    pool.shutdown(wait=False)
+    try:
+        # Get credentials (handles both secret ID and direct JSON content)
+        creds, secret_s = _timed(get_secret, secret_value)
+    except Exception:
+        logger.exception("Failed to fetch Krowd secret; closing browser.")
+        # Don't wait for the launch/navigation: quit the driver whenever it comes back
+        browser.add_done_callback(_discard_browser)
+        timings = {"secret_s": round(time.monotonic() - began, 3), "browser_s": None}
+        return {**_error("Failed to fetch Krowd secret."), "timings": timings}
+    driver, browser_s = browser.result()
+    ready_s = time.monotonic() - began
+    timings = {
+        "secret_s": round(secret_s, 3),
+        "browser_s": round(browser_s, 3),
+        "ready_s": round(ready_s, 3),
+        # Sequential would have been secret + browser; the overlap hides the shorter one
+        "overlap_saved_s": round(max(0.0, secret_s + browser_s - ready_s), 3),
+    }
+    logger.info(f"Secret and browser ready in {timings['ready_s']}s (saved {timings['overlap_saved_s']}s by overlapping)")
+
+    username = creds.get("username")
+    password = creds.get("password")
+    if not username or not password:
+        close_driver(driver)
+        return {**_error("Krowd secret must contain username and password fields."), "timings": timings}
+
+    if driver is None:
+        logger.warning("Speculative browser launch failed; retrying login from scratch.")
+
+    # Login & fetch schedule
+    cookies = krowd_login(username=username, password=password, headless=headless, driver=driver)
+    if not cookies:
+        return {**_error("Krowd login failed."), "timings": timings}
+
+    schedule = get_krowd_schedule(cookies=cookies)
+    if schedule is None:
+        return {**_error("Failed to fetch schedule."), "timings": timings}
+
+    # Upload to GCS
+    # Format follows the blob suffix; *.ndjson[.gz] is streamed record by record
+    count = upload_schedule(bucket_name=bucket, blob_name=blob_name, records=schedule)
+    gcs_path = f"gs://{bucket}/{blob_name}"
+    logger.info(f"Upload complete: {gcs_path}")
+    return {
+        "status": "success",
+        "gcs_path": gcs_path,
+        "shifts_count": count,
+        "timings": timings,
+    }
+
+
+def run_tenants(args) -> int:
+    date_str = args.date or datetime.now(UTC).strftime("%Y-%m-%d")
+    try:
+        datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        logger.critical("Invalid date format. Use YYYY-MM-DD.")
+        return 1
+
+    def scrape_tenant(tenant: Dict[str, Any]) -> Dict[str, Any]:
+        if not tenant.get("krowd_secret"):
+            return _error(f"Tenant {tenant['id']} has no krowd_secret.")
+        blob_name = schedule_blob_name(date_str, root=f"tenants/{tenant['id']}/single/", fmt=args.format)
+        return scrape_to_gcs(tenant["krowd_secret"], args.bucket, blob_name, headless=args.headless)
+
+    return run_shard(args, "scraper", scrape_tenant, date_str)
+
+
 def main():
     args = parse_args()
 
+    if args.tenants:
+        sys.exit(run_tenants(args))
+
     # If workflow passed an explicit gcs path, use it (overrides bucket/date/timestamp)
     if args.gcs_path:
-        if not args.gcs_path.startswith("gs://"):
+        parsed = parse_gcs_path(args.gcs_path)
+        if not parsed:
             logger.critical("gcs_path must start with gs://")
             sys.exit(1)
-        parts = args.gcs_path[5:].split("/", 1)
-        args.bucket = parts[0]
-        blob_name = parts[1] if len(parts) > 1 else ""
+        args.bucket, blob_name = parsed
     else:
         if not args.bucket:
             logger.critical("GCS bucket not provided. Set --bucket or BUCKET_NAME env var. Must provide either --gcs_path or --bucket.")
@@ -60,51 +169,20 @@ def main():
         date_str = args.date or datetime.now(UTC).strftime("%Y-%m-%d")
 
         try:
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+            blob_name = schedule_blob_name(date_str, fmt=args.format)
         except ValueError:
             logger.critical("Invalid date format. Use YYYY-MM-DD.")
             sys.exit(1)
 
-        date_path = date_obj.strftime("%Y/%m/%d")
-        timestamp_str = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
-        blob_name = f"single/{date_path}/schedule-{timestamp_str}.json"
-
     secret_value = args.secret
     if not secret_value:
         logger.critical("Krowd secret not provided. Set --secret or KROWD_SECRET env var.")
         sys.exit(1)
 
-    # Get credentials (handles both secret ID and direct JSON content)
-    creds = get_secret(secret_value)
-    username = creds.get("username")
-    password = creds.get("password")
-    if not username or not password:
-        logger.critical("Krowd secret must contain username and password fields.")
-        sys.exit(1)
-
-    # Login & fetch schedule
-    cookies = krowd_login(username=username, password=password, headless=args.headless)
-    if not cookies:
-        logger.critical("Krowd login failed.")
-        sys.exit(1)
-
-    schedule = get_krowd_schedule(cookies=cookies)
-    if schedule is None:
-        logger.critical("Failed to fetch schedule.")
-        sys.exit(1)
-
-    # Upload to GCS
-    upload_json(bucket_name=args.bucket, blob_name=blob_name, data=schedule)
-
-    # Output result
-    result = {
-        "status": "success",
-        "gcs_path": args.gcs_path,
-        "shifts_count": len(schedule),
-    }
+    result = scrape_to_gcs(secret_value, args.bucket, blob_name, headless=args.headless)
     print(json.dumps(result))
-    logger.info(f"Upload complete: {args.gcs_path}")
-
+    if result["status"] != "success":
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
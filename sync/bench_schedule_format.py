@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+bench_schedule_format.py
+Compare peak RSS of reading a schedule as one JSON array (download_as_text + json.loads,
+the original path) vs streamed NDJSON / gzipped NDJSON (lib.ndjson.iter_records).
+Each reader runs in a fresh subprocess and reduces records to compact (start, end)
+pairs, like sync.load_shifts. Local files stand in for GCS blobs.
+
+  python bench_schedule_format.py [--shifts 100000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from lib.ndjson import iter_records, write_records
+
+
+def synthetic_shifts(n: int):
+    base = datetime(2024, 1, 1, 9, 0, 0)
+    for i in range(n):
+        start = base + timedelta(hours=6 * i)
+        yield {
+            "shiftId": 10_000_000 + i,
+            "startDateTime": start.strftime("%Y-%m-%dT%H:%M:%S"),
+            "endDateTime": (start + timedelta(hours=5)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "restaurantNumber": "1234",
+            "teamMemberId": "E%07d" % (i % 500),
+            "jobCode": "SERVER",
+            "jobName": "Server",
+            "station": "Section %d" % (i % 12),
+            "breakMinutes": 30,
+            "isPublished": True,
+            "notes": "Synthetic shift for format benchmark",
+        }
+
+
+def compact(records):
+    # Mirrors lib.google_calendar.compact_shifts without importing the Google client
+    out = []
+    for r in records:
+        start, end = r.get("startDateTime"), r.get("endDateTime")
+        if start and end:
+            out.append({"start": start, "end": end})
+    return out
+
+
+def read(fmt: str, path: str) -> int:
+    if fmt == "json":
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+        return len(compact(json.loads(raw)))
+    with open(path, "rb") as f:
+        return len(compact(iter_records(f, gzipped=fmt == "ndjson.gz")))
+
+
+def peak_rss_mib() -> float:
+    # VmHWM resets on exec; ru_maxrss can carry over the parent's peak from fork on Linux
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(fmt: str, path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", fmt, path],
+        check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--shifts", type=int, default=100_000)
+    p.add_argument("--child", nargs=2, metavar=("FORMAT", "PATH"), help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        fmt, path = args.child
+        count = read(fmt, path) if fmt != "noop" else 0
+        print(json.dumps({"count": count, "peak_rss_mib": peak_rss_mib()}))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {fmt: os.path.join(tmp, f"schedule.{fmt}") for fmt in ("json", "ndjson", "ndjson.gz")}
+        with open(paths["json"], "w", encoding="utf-8") as f:
+            json.dump(list(synthetic_shifts(args.shifts)), f)
+        for fmt in ("ndjson", "ndjson.gz"):
+            with open(paths[fmt], "wb") as f:
+                write_records(f, synthetic_shifts(args.shifts), gzipped=fmt == "ndjson.gz")
+
+        baseline = measure("noop", paths["json"])["peak_rss_mib"]
+        print(f"{args.shifts} shifts; interpreter baseline {baseline:.1f} MiB")
+        print(f"{'format':<10} {'size MiB':>9} {'peak RSS MiB':>13} {'over baseline':>14}")
+        for fmt, path in paths.items():
+            r = measure(fmt, path)
+            assert r["count"] == args.shifts, r
+            size = os.path.getsize(path) / 2**20
+            print(f"{fmt:<10} {size:>9.1f} {r['peak_rss_mib']:>13.1f} {r['peak_rss_mib'] - baseline:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
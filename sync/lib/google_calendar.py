@@ -1,6 +1,9 @@
 # lib/google_calendar.py
+import hashlib
 import logging
-from typing import Dict, List, Optional
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
@@ -49,29 +52,147 @@ def find_calendar_by_summary(service, summary_name: str) -> Optional[str]:
             break
     return None
 
+def list_events(service, calendar_id: str, q: Optional[str] = None, time_min: Optional[str] = None,
+                time_max: Optional[str] = None) -> List[Dict]:
+    """List all (single) events in a calendar, following pagination."""
+    events = []
+    page_token = None
+    while True:
+        resp = service.events().list(
+            calendarId=calendar_id, q=q, timeMin=time_min, timeMax=time_max,
+            singleEvents=True, pageToken=page_token,
+        ).execute()
+        events.extend(resp.get("items", []))
+        page_token = resp.get("nextPageToken")
+        if not page_token:
+            break
+    return events
+
+def shift_times(shift: Dict) -> Tuple[Optional[str], Optional[str]]:
+    # shifts expected to contain startDateTime and endDateTime ISO strings or adapt if different
+    start = shift.get("startDateTime") or shift.get("start") or shift.get("start_time")
+    end = shift.get("endDateTime") or shift.get("end") or shift.get("end_time")
+    return start, end
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """
+    Timezone-aware datetime for an ISO shift/event time. Strings with "Z" or an offset
+    keep it; naive strings are local to TIME_ZONE.
+    """
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=ZoneInfo(TIME_ZONE))
+
+def local_date(value: Optional[str]) -> Optional[date]:
+    """Calendar date of a time in TIME_ZONE (a UTC late-evening shift is the local day)."""
+    dt = parse_time(value)
+    return dt.astimezone(ZoneInfo(TIME_ZONE)).date() if dt else None
+
+def compact_shifts(shifts: Iterable[Dict]) -> List[Dict[str, str]]:
+    """
+    {"start", "end"} per shift with the original time strings (offsets included), in
+    input order; shifts without times are dropped. Consumes the input one record at a
+    time, so a streamed schedule is never held whole.
+    """
+    compact = []
+    for shift in shifts:
+        start, end = shift_times(shift)
+        if not start or not end:
+            logger.warning("Skipping shift with missing times: %s", shift)
+            continue
+        compact.append({"start": start, "end": end})
+    return compact
+
+def shift_event_id(calendar_id: str, start: str, end: str) -> str:
+    """
+    Deterministic event id for a shift. Calendar ids must use base32hex characters
+    (a-v, 0-9); a hex digest is a subset of that alphabet.
+    """
+    key = f"{calendar_id}|{start}|{end}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def build_event_body(start: str, end: str, event_id: Optional[str] = None) -> Dict:
+    event_body = {
+        "summary": EVENT_SUMMARY,
+        "location": EVENT_LOCATION,
+        "description": EVENT_DESCRIPTION,
+        "start": {"dateTime": start, "timeZone": TIME_ZONE},
+        "end": {"dateTime": end, "timeZone": TIME_ZONE},
+    }
+    if event_id:
+        event_body["id"] = event_id
+    return event_body
+
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded", "dailyLimitExceeded")
+
+class RateLimited(Exception):
+    """The Calendar API refused a call for quota or rate limits; further calls will fail too."""
+
+def _status(e: HttpError) -> Optional[int]:
+    return getattr(e.resp, "status", None)
+
+def _check_rate_limited(e: HttpError, what: str):
+    status = _status(e)
+    if status == 429 or (status == 403 and any(
+            r in (getattr(e, "content", b"") or b"").decode("utf-8", "replace") for r in RATE_LIMIT_REASONS)):
+        logger.error(f"Rate limited while trying to {what}")
+        raise RateLimited(what) from e
+
+def delete_event(service, calendar_id: str, event_id: str) -> bool:
+    """Delete one event. An already-deleted event counts as success. Raises RateLimited."""
+    try:
+        service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+        logger.info(f"Deleted event {event_id}")
+        return True
+    except HttpError as e:
+        if _status(e) in (404, 410):
+            logger.info(f"Event {event_id} already deleted")
+            return True
+        _check_rate_limited(e, f"delete event {event_id}")
+        logger.exception(f"Failed to delete event {event_id}")
+        return False
+
+def upsert_event(service, calendar_id: str, event_body: Dict) -> bool:
+    """
+    Insert an event with a client-supplied id. If the id already exists (including a
+    previously deleted event, which the API keeps as cancelled) it is updated in place.
+    Raises RateLimited.
+    """
+    event_id = event_body["id"]
+    try:
+        service.events().insert(calendarId=calendar_id, body=event_body).execute()
+        logger.info(f"Created event {event_id} for {event_body['start']['dateTime']}")
+        return True
+    except HttpError as e:
+        if _status(e) != 409:
+            _check_rate_limited(e, f"create event {event_id}")
+            logger.exception(f"Failed to create event {event_id}")
+            return False
+    try:
+        body = dict(event_body, status="confirmed")
+        service.events().update(calendarId=calendar_id, eventId=event_id, body=body).execute()
+        logger.info(f"Updated existing event {event_id}")
+        return True
+    except HttpError as e:
+        _check_rate_limited(e, f"update event {event_id}")
+        logger.exception(f"Failed to update event {event_id}")
+        return False
+
 def delete_events(service, calendar_id: str, events: List[Dict]):
     for ev in events:
-        try:
-            service.events().delete(calendarId=calendar_id, eventId=ev["id"]).execute()
-            logger.info(f"Deleted event {ev.get('id')}")
-        except HttpError:
-            logger.exception(f"Failed to delete event {ev.get('id')}")
+        delete_event(service, calendar_id, ev["id"])
 
 def create_events(service, calendar_id: str, shifts: List[Dict]):
-    # shifts expected to contain startDateTime and endDateTime ISO strings or adapt if different
     for shift in shifts:
-        start = shift.get("startDateTime") or shift.get("start") or shift.get("start_time")
-        end = shift.get("endDateTime") or shift.get("end") or shift.get("end_time")
+        start, end = shift_times(shift)
         if not start or not end:
             logger.warning("Skipping shift with missing times: %s", shift)
             continue
-        event_body = {
-            "summary": EVENT_SUMMARY,
-            "location": EVENT_LOCATION,
-            "description": EVENT_DESCRIPTION,
-            "start": {"dateTime": start, "timeZone": TIME_ZONE},
-            "end": {"dateTime": end, "timeZone": TIME_ZONE},
-        }
+        event_body = build_event_body(start, end)
         try:
             created = service.events().insert(calendarId=calendar_id, body=event_body).execute()
             logger.info(f"Created event {created.get('id')} for {start}")
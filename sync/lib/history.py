@@ -0,0 +1,71 @@
+# lib/history.py
+"""
+Helpers over the archived schedule snapshots (<root>YYYY/MM/DD/schedule-<ts>.json).
+
+A snapshot scraped on day D holds the shifts from the Monday of D's week onward, so it
+is authoritative for everything from that Monday on. Only the latest snapshot per week
+matters; replaying them oldest to newest yields the final schedule.
+"""
+import logging
+import re
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from google.cloud import storage
+
+from lib.google_calendar import local_date, shift_times
+
+logger = logging.getLogger("history")
+
+_DATE_PATH = re.compile(r"(\d{4})/(\d{2})/(\d{2})/")
+
+
+def week_monday(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def shift_date(shift: Dict) -> Optional[date]:
+    start, _ = shift_times(shift)
+    return local_date(start)
+
+
+def snapshot_date(blob_name: str, root: str = "single/") -> Optional[date]:
+    m = _DATE_PATH.match(blob_name[len(root):]) if blob_name.startswith(root) else None
+    if not m:
+        return None
+    try:
+        return date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    except ValueError:
+        return None
+
+
+def latest_weekly_snapshots(bucket: str, start: date, end: date, root: str = "single/") -> List[Tuple[date, str]]:
+    """
+    (week monday, blob name) of the latest snapshot of every week touching [start, end],
+    oldest first, using a single listing bounded by start/end offsets.
+    """
+    first = week_monday(start)
+    start_offset = f"{root}{first.strftime('%Y/%m/%d')}/"
+    end_offset = f"{root}{(end + timedelta(days=1)).strftime('%Y/%m/%d')}/"
+    logger.info(f"Listing snapshots gs://{bucket}/{start_offset} .. {end_offset}")
+
+    client = storage.Client()
+    latest = {}
+    for blob in client.list_blobs(bucket, prefix=root, start_offset=start_offset, end_offset=end_offset):
+        day = snapshot_date(blob.name, root)
+        if day is None:
+            continue
+        monday = week_monday(day)
+        current = latest.get(monday)
+        if current is None or blob.updated > current.updated:
+            latest[monday] = blob
+    return [(monday, latest[monday].name) for monday in sorted(latest)]
+
+
+def merge_snapshots(snapshots: Iterable[Tuple[date, List[Dict]]]) -> List[Dict]:
+    """Replay (week monday, shifts) snapshots oldest first into the final shift list."""
+    merged: List[Dict] = []
+    for monday, shifts in snapshots:
+        merged = [s for s in merged if (shift_date(s) or date.min) < monday]
+        merged.extend(shifts)
+    return merged
@@ -0,0 +1,178 @@
+# lib/ics.py
+"""
+Render shifts as an RFC 5545 calendar feed and publish it to GCS.
+
+UIDs are derived from the feed's blob name and the shift times (the same hash as the
+calendar event ids, but keyed by feed rather than calendar id, since an ICS-only sync
+has no calendar), so subscribed clients keep their copy of a shift across regenerations.
+Times are normalized to TIME_ZONE wall-clock first, so a shift keeps its UID whether the
+scraper wrote it with an offset, with "Z" or naive. The feed is only rewritten when the
+schedule hash changes, so an unchanged schedule costs no writes.
+"""
+import hashlib
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from lib.gcs import authenticated_url, get_metadata, upload_text, public_url, signed_url
+from lib.google_calendar import (
+    EVENT_DESCRIPTION,
+    EVENT_LOCATION,
+    EVENT_SUMMARY,
+    TIME_ZONE,
+    parse_time,
+    shift_event_id,
+    shift_times,
+)
+
+logger = logging.getLogger("ics")
+
+PRODID = "-//work-schedule-sync//ics feed//EN"
+UID_DOMAIN = "work-schedule-sync"
+HASH_METADATA_KEY = "schedule-sha256"
+
+# US Pacific rules (in effect since 2007); TIME_ZONE is America/Los_Angeles.
+VTIMEZONE = [
+    "BEGIN:VTIMEZONE",
+    f"TZID:{TIME_ZONE}",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:-0800",
+    "TZOFFSETTO:-0700",
+    "TZNAME:PDT",
+    "DTSTART:19700308T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=2SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:-0700",
+    "TZOFFSETTO:-0800",
+    "TZNAME:PST",
+    "DTSTART:19701101T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=11;BYDAY=1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]
+
+
+def _escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line: str) -> str:
+    """Fold a content line at 75 octets (RFC 5545 3.1) without splitting UTF-8 sequences."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line
+    parts = []
+    limit = 75
+    while raw:
+        cut = min(limit, len(raw))
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw = raw[cut:]
+        limit = 74  # continuation lines start with a space
+    return "\r\n ".join(parts)
+
+
+def _local_time(value: str) -> str:
+    # "2024-05-23T10:00:00" (normalized local time) -> "20240523T100000"
+    return value.replace("-", "").replace(":", "")
+
+
+def _normalize(value: str) -> Optional[str]:
+    """
+    Wall-clock time in TIME_ZONE as "YYYY-MM-DDTHH:MM:SS". Times with "Z" or an offset
+    are converted; naive strings are already local.
+    """
+    dt = parse_time(value)
+    if dt is None:
+        return None
+    return dt.astimezone(ZoneInfo(TIME_ZONE)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def feed_events(shifts: Iterable[Dict]) -> List[Dict[str, str]]:
+    """Sorted, de-duplicated local {"start", "end"} times as written to the feed."""
+    seen = {}
+    for shift in shifts:
+        start, end = shift_times(shift)
+        start, end = _normalize(start), _normalize(end)
+        if not start or not end:
+            continue
+        seen[(start, end)] = {"start": start, "end": end}
+    return [seen[k] for k in sorted(seen)]
+
+
+def schedule_hash(feed_key: str, shifts: List[Dict[str, str]]) -> str:
+    h = hashlib.sha256(feed_key.encode("utf-8"))
+    for s in shifts:
+        h.update(f"\n{s['start']}|{s['end']}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def render_ics(feed_key: str, calendar_name: str, shifts: List[Dict[str, str]]) -> str:
+    dtstamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(calendar_name)}",
+        f"X-WR-TIMEZONE:{TIME_ZONE}",
+        *VTIMEZONE,
+    ]
+    for s in shifts:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{shift_event_id(feed_key, s['start'], s['end'])}@{UID_DOMAIN}",
+            f"DTSTAMP:{dtstamp}",
+            f"DTSTART;TZID={TIME_ZONE}:{_local_time(s['start'])}",
+            f"DTEND;TZID={TIME_ZONE}:{_local_time(s['end'])}",
+            f"SUMMARY:{_escape(EVENT_SUMMARY)}",
+            f"LOCATION:{_escape(EVENT_LOCATION)}",
+            f"DESCRIPTION:{_escape(EVENT_DESCRIPTION)}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+def feed_url(bucket: str, blob_name: str, public: bool = False, signed_days: int = 0) -> Optional[str]:
+    """
+    Url to subscribe to. Public feeds and the default authenticated url are stable across
+    runs; a signed url (signed_days > 0, at most 7) changes every run and stops working
+    when it expires, so subscribers must be given the new one.
+    """
+    if public:
+        return public_url(bucket, blob_name)
+    if signed_days > 0:
+        return signed_url(bucket, blob_name, timedelta(days=signed_days))
+    return authenticated_url(bucket, blob_name)
+
+
+def publish_ics(bucket: str, blob_name: str, calendar_name: str, shifts: Iterable[Dict],
+                public: bool = False, signed_days: int = 0) -> Dict[str, Optional[str]]:
+    """Write the feed to GCS if the schedule changed and return its url."""
+    normalized = feed_events(shifts)
+    digest = schedule_hash(blob_name, normalized)
+    metadata = get_metadata(bucket, blob_name)
+    changed = metadata is None or metadata.get(HASH_METADATA_KEY) != digest
+    if changed:
+        upload_text(
+            bucket, blob_name, render_ics(blob_name, calendar_name, normalized),
+            content_type="text/calendar; charset=utf-8",
+            metadata={HASH_METADATA_KEY: digest},
+            cache_control="public, max-age=300" if public else "private, max-age=0",
+            predefined_acl="publicRead" if public else None,
+        )
+    else:
+        logger.info(f"Feed gs://{bucket}/{blob_name} unchanged; skipping write")
+    return {
+        "gcs_path": f"gs://{bucket}/{blob_name}",
+        "url": feed_url(bucket, blob_name, public, signed_days),
+        "events": len(normalized),
+        "written": changed,
+        "hash": digest,
+    }
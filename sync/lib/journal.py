@@ -0,0 +1,184 @@
+# lib/journal.py
+"""
+Operation journal for resumable syncs.
+
+Before touching the calendar the sync writes its plan (deletes + upserts) to GCS.
+Each op is marked done as it completes and the journal is flushed periodically, so a
+retried job only replays what is left; once every op has succeeded the journal is
+deleted. Ops are idempotent: deletes tolerate missing events and inserts use
+client-supplied ids derived from the shift, so replaying an op that already went
+through before the last flush is harmless.
+"""
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Callable, Dict, Iterable, List, Optional
+
+from lib.gcs import delete_blob, download_json, list_blob_names, upload_json
+from lib.history import snapshot_date, week_monday
+from lib.google_calendar import (
+    RateLimited,
+    shift_times,
+    shift_event_id,
+    build_event_body,
+    delete_event,
+    parse_time,
+    upsert_event,
+)
+
+logger = logging.getLogger("journal")
+
+JOURNAL_PREFIX = "journals"
+FLUSH_EVERY = 25
+
+
+def journal_blob_name(calendar_summary: str, source_blob: str) -> str:
+    return f"{JOURNAL_PREFIX}/{calendar_summary}/{source_blob}.journal.json"
+
+
+def delete_superseded(bucket: str, calendar_summary: str, blob: str, root: str = "single/") -> int:
+    """
+    Delete journals of older schedule blobs in the same week as `blob` for this calendar.
+    Called once `blob` has synced completely, which makes their pending ops moot.
+    """
+    day = snapshot_date(blob, root)
+    if day is None:
+        return 0
+    monday = week_monday(day)
+    base = f"{JOURNAL_PREFIX}/{calendar_summary}/{root}"
+    ours = journal_blob_name(calendar_summary, blob)
+    names = list_blob_names(
+        bucket, prefix=base,
+        start_offset=f"{base}{monday.strftime('%Y/%m/%d')}/",
+        end_offset=f"{base}{(monday + timedelta(days=7)).strftime('%Y/%m/%d')}/",
+    )
+    # Scraper blob names embed a UTC timestamp, so name order is schedule order
+    stale = [name for name in names if name < ours]
+    for name in stale:
+        delete_blob(bucket_name=bucket, blob_name=name)
+    return len(stale)
+
+
+def _same_time(a: Optional[str], b: Optional[str]) -> bool:
+    # The API answers in calendar-local time with an offset; shifts may be naive, Z or offset
+    ta, tb = parse_time(a), parse_time(b)
+    return ta is not None and ta == tb
+
+
+def plan_ops(calendar_id: str, shifts: Iterable[Dict], existing_events: List[Dict]) -> List[Dict]:
+    """
+    Build the list of ops that turns existing_events into the desired shifts.
+    Events that already match a shift (same derived id and times) are left alone.
+    """
+    existing = {ev["id"]: ev for ev in existing_events if ev.get("status") != "cancelled"}
+    desired = {}
+    for shift in shifts:
+        start, end = shift_times(shift)
+        if not start or not end:
+            logger.warning("Skipping shift with missing times: %s", shift)
+            continue
+        event_id = shift_event_id(calendar_id, start, end)
+        desired[event_id] = {"start": start, "end": end}
+
+    ops = []
+    for event_id, ev in existing.items():
+        if event_id not in desired:
+            start = ev.get("start", {}).get("dateTime") or ev.get("start", {}).get("date")
+            ops.append({"op": "delete", "event_id": event_id, "start": start, "done": False})
+    for event_id, times in desired.items():
+        ev = existing.get(event_id)
+        if ev and _same_time(ev.get("start", {}).get("dateTime"), times["start"]) \
+                and _same_time(ev.get("end", {}).get("dateTime"), times["end"]):
+            continue
+        ops.append({"op": "upsert", "event_id": event_id, **times, "done": False})
+    return ops
+
+
+def apply_op(service, calendar_id: str, op: Dict) -> bool:
+    if op["op"] == "delete":
+        return delete_event(service, calendar_id, op["event_id"])
+    return upsert_event(service, calendar_id, build_event_body(op["start"], op["end"], op["event_id"]))
+
+
+class Journal:
+    def __init__(self, bucket: str, blob_name: str, data: Dict):
+        self.bucket = bucket
+        self.blob_name = blob_name
+        self.data = data
+
+    @classmethod
+    def load(cls, bucket: str, blob_name: str) -> Optional["Journal"]:
+        data = download_json(bucket_name=bucket, blob_name=blob_name, missing_ok=True)
+        if data is None:
+            return None
+        return cls(bucket, blob_name, data)
+
+    @classmethod
+    def create(cls, bucket: str, blob_name: str, calendar_id: str, source: str, ops: List[Dict]) -> "Journal":
+        data = {
+            "calendar_id": calendar_id,
+            "source": source,
+            "created_at": datetime.now(UTC).isoformat(),
+            "ops": ops,
+        }
+        journal = cls(bucket, blob_name, data)
+        journal.flush()
+        return journal
+
+    @property
+    def ops(self) -> List[Dict]:
+        return self.data["ops"]
+
+    @property
+    def pending(self) -> List[Dict]:
+        return [op for op in self.ops if not op["done"]]
+
+    @property
+    def complete(self) -> bool:
+        return not self.pending
+
+    def flush(self):
+        self.data["updated_at"] = datetime.now(UTC).isoformat()
+        upload_json(bucket_name=self.bucket, blob_name=self.blob_name, data=self.data)
+
+    def delete(self):
+        delete_blob(bucket_name=self.bucket, blob_name=self.blob_name)
+
+    def run(self, service, keep_alive: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+        """
+        Execute pending ops, flushing progress every FLUSH_EVERY ops. keep_alive is called
+        before each op (e.g. Lease.keep_alive); if it returns False the run stops and the
+        remaining ops are left pending. The same happens on the first quota/rate-limit error.
+        """
+        calendar_id = self.data["calendar_id"]
+        stats = {"deleted": 0, "upserted": 0, "failed": 0, "skipped": len(self.ops) - len(self.pending),
+                 "aborted": 0, "rate_limited": 0}
+        since_flush = 0
+        try:
+            for op in self.pending:
+                if keep_alive and not keep_alive():
+                    logger.critical("Lost the sync lease; stopping with ops still pending.")
+                    stats["aborted"] = 1
+                    break
+                try:
+                    ok = apply_op(service, calendar_id, op)
+                except RateLimited:
+                    # Every further call would fail and burn quota; leave the rest for the retry
+                    logger.critical("Calendar API quota/rate limit hit; stopping with ops still pending.")
+                    stats["rate_limited"] = 1
+                    break
+                if ok:
+                    op["done"] = True
+                    stats["deleted" if op["op"] == "delete" else "upserted"] += 1
+                    since_flush += 1
+                else:
+                    stats["failed"] += 1
+                if since_flush >= FLUSH_EVERY:
+                    self.flush()
+                    since_flush = 0
+        finally:
+            if self.complete and not stats["failed"]:
+                # Nothing left to resume; a rerun simply re-plans against the calendar
+                self.delete()
+            else:
+                self.flush()
+        return stats
@@ -7,6 +7,7 @@ from typing import Dict, List, Optional, Any
 import requests
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -47,12 +48,47 @@ def _make_driver(headless: bool = True):
     driver = webdriver.Chrome(options=options)
     return driver
 
-def krowd_login(username: str, password: str, headless: bool = True, timeout: int = 30) -> Optional[Dict[str,str]]:
+# Selenium's own page load timeout, restored after the capped speculative load
+DEFAULT_PAGE_LOAD_TIMEOUT = 300
+
+def open_login_page(headless: bool = True, page_load_timeout: int = 30):
+    """
+    Launch Chromium and navigate to the Krowd login page without credentials, so it can
+    run ahead of the secret fetch. Returns the driver, or None if the launch failed.
+    The page load is capped (Selenium's default is 300s); a slow page is handed back
+    as-is and krowd_login keeps waiting for the form. The cap only covers this first
+    load: the driver is handed back with the default timeout.
+    """
     driver = None
     try:
         driver = _make_driver(headless=headless)
+        driver.set_page_load_timeout(page_load_timeout)
         logger.info("Opening Krowd login page...")
-        driver.get(KROWD_LOGIN_URL)
+        try:
+            driver.get(KROWD_LOGIN_URL)
+        except TimeoutException:
+            logger.warning(f"Krowd login page still loading after {page_load_timeout}s; continuing.")
+        driver.set_page_load_timeout(DEFAULT_PAGE_LOAD_TIMEOUT)
+        return driver
+    except Exception:
+        logger.exception("Failed to open Krowd login page.")
+        close_driver(driver)
+        return None
+
+def close_driver(driver):
+    if driver:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+def krowd_login(username: str, password: str, headless: bool = True, timeout: int = 30, driver=None) -> Optional[Dict[str,str]]:
+    """Log in and return session cookies. Pass a driver from open_login_page() to skip the launch; it is always quit."""
+    try:
+        if driver is None:
+            driver = open_login_page(headless=headless)
+            if driver is None:
+                return None
         wait = WebDriverWait(driver, timeout)
         # Try common login input IDs
         wait.until(EC.presence_of_element_located((By.ID, "user"))).send_keys(username)
@@ -80,11 +116,7 @@ def krowd_login(username: str, password: str, headless: bool = True, timeout: in
         logger.exception("Krowd login failed.")
         return None
     finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception:
-                pass
+        close_driver(driver)
 
 def get_krowd_schedule(cookies: Dict[str,str], shift_start_date: Optional[str]=None) -> Optional[List[Any]]:
     if not cookies:
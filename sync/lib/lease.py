@@ -0,0 +1,191 @@
+# lib/lease.py
+"""
+GCS-backed lease per (calendar, schedule week) so overlapping sync runs coalesce.
+
+The lease is a small JSON object written with generation-match preconditions:
+  {"holder": ..., "version": <schedule blob generation>, "source": "gs://...",
+   "expires_at": <epoch>, "pending": null | {"version": ..., "source": ...}}
+
+A run whose schedule is not newer than the holder's (or the queued pending one) has
+nothing to add and coalesces, unless its schedule still has unfinished journal ops. A
+newer run either records itself as `pending`, which the holder picks up before releasing,
+or waits for the lease to free up. An expired lease (holder crashed) can be taken over;
+a queued pending input survives the takeover.
+
+On Cloud Run the holder id is stable per (execution, task, lease), so a retried task
+takes its own lease straight back instead of coalescing against it. SIGTERM (task
+timeout) expires held leases before exiting; SIGKILL still waits out the TTL.
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Set
+
+from lib.gcs import delete_if_generation, read_json_generation, write_json_if_generation
+
+logger = logging.getLogger("lease")
+
+LEASE_PREFIX = "leases"
+DEFAULT_TTL = int(os.getenv("LEASE_TTL_SECONDS", "900"))
+POLL_SECONDS = 10
+
+ACQUIRED = "acquired"
+COALESCED = "coalesced"
+HANDED_OFF = "handed_off"
+
+
+_held: Set["Lease"] = set()
+_held_lock = threading.Lock()
+
+
+def lease_blob_name(calendar_summary: str, week: str) -> str:
+    return f"{LEASE_PREFIX}/{calendar_summary}/{week}.json"
+
+
+def _holder_id(blob_name: str) -> str:
+    execution = os.getenv("CLOUD_RUN_EXECUTION")
+    if execution:
+        return f"{execution}/{os.getenv('CLOUD_RUN_TASK_INDEX', '0')}/{blob_name}"
+    return f"local-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def install_sigterm_handler():
+    """On SIGTERM, expire every lease this process holds, then exit."""
+    def handler(signum, frame):
+        with _held_lock:
+            leases = list(_held)
+        logger.warning(f"SIGTERM: expiring {len(leases)} held lease(s)")
+        for lease in leases:
+            try:
+                lease.expire()
+            except Exception:
+                logger.exception(f"Failed to expire lease gs://{lease.bucket}/{lease.blob_name}")
+        sys.exit(128 + signum)
+    signal.signal(signal.SIGTERM, handler)
+
+
+class Lease:
+    def __init__(self, bucket: str, blob_name: str, ttl: int = DEFAULT_TTL):
+        self.bucket = bucket
+        self.blob_name = blob_name
+        self.ttl = ttl
+        self.holder = _holder_id(blob_name)
+        self.generation = 0
+        self.data: Dict[str, Any] = {}
+
+    def _held(self, held: bool):
+        with _held_lock:
+            (_held.add if held else _held.discard)(self)
+
+    def _take(self, version: int, source: str, pending: Optional[Dict], generation: int) -> bool:
+        data = {
+            "holder": self.holder,
+            "version": version,
+            "source": source,
+            "expires_at": time.time() + self.ttl,
+            "pending": pending if pending and pending["version"] > version else None,
+        }
+        new_gen = write_json_if_generation(self.bucket, self.blob_name, data, generation)
+        if new_gen is None:
+            return False
+        self.generation, self.data = new_gen, data
+        self._held(True)
+        return True
+
+    def acquire(self, version: int, source: str, wait: int = 0, resume: bool = False) -> str:
+        """
+        Try to take the lease for a schedule at `version`. Returns ACQUIRED, COALESCED
+        (an equal-or-newer schedule is already held or queued) or HANDED_OFF (ours was
+        queued as pending for the holder). With wait > 0, waits up to that many seconds
+        for the holder to finish instead of handing off. resume=True means this schedule's
+        journal still has pending ops, so an equal version held elsewhere does not make
+        this run redundant.
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            data, generation = read_json_generation(self.bucket, self.blob_name)
+            if data is None or data.get("expires_at", 0) < time.time():
+                if data is not None:
+                    logger.warning(f"Taking over expired lease gs://{self.bucket}/{self.blob_name} from {data.get('holder')}")
+                if self._take(version, source, (data or {}).get("pending"), generation):
+                    logger.info(f"Acquired lease gs://{self.bucket}/{self.blob_name}")
+                    return ACQUIRED
+                continue
+
+            if data.get("holder") == self.holder:
+                # Our own lease from a killed attempt of this task: take it back
+                if self._take(version, source, data.get("pending"), generation):
+                    logger.info(f"Reclaimed own lease gs://{self.bucket}/{self.blob_name}")
+                    return ACQUIRED
+                continue
+
+            held = data.get("version", 0)
+            queued = (data.get("pending") or {}).get("version", 0)
+            if max(held, queued) > version or queued == version or (held == version and not resume):
+                logger.info(f"Lease held by {data.get('holder')} with an equal or newer schedule; coalescing")
+                return COALESCED
+
+            if time.monotonic() < deadline:
+                time.sleep(POLL_SECONDS)
+                continue
+
+            data["pending"] = {"version": version, "source": source}
+            if write_json_if_generation(self.bucket, self.blob_name, data, generation) is not None:
+                logger.info(f"Handed schedule {source} to lease holder {data.get('holder')}")
+                return HANDED_OFF
+
+    def renew(self) -> bool:
+        """Push expires_at out by another TTL. False if the lease is no longer ours."""
+        while True:
+            data, generation = read_json_generation(self.bucket, self.blob_name)
+            if not data or data.get("holder") != self.holder:
+                logger.warning("Lease lost before renewal.")
+                return False
+            data["expires_at"] = time.time() + self.ttl
+            new_gen = write_json_if_generation(self.bucket, self.blob_name, data, generation)
+            if new_gen is not None:
+                self.generation, self.data = new_gen, data
+                return True
+
+    def keep_alive(self) -> bool:
+        """
+        Cheap check for long-running work: renews once a third of the TTL has elapsed.
+        Returns False if the lease was lost, in which case the caller must stop writing.
+        """
+        if time.time() < self.data.get("expires_at", 0) - self.ttl * 2 / 3:
+            return True
+        return self.renew()
+
+    def release(self) -> Optional[Dict[str, Any]]:
+        """
+        Release the lease, or if a newer input was handed over meanwhile, keep holding it
+        and return that pending {"version", "source"} for the caller to process next.
+        """
+        while True:
+            data, generation = read_json_generation(self.bucket, self.blob_name)
+            if not data or data.get("holder") != self.holder:
+                logger.warning("Lease was taken over before release.")
+                self._held(False)
+                return None
+            pending = data.get("pending")
+            if pending:
+                if self._take(pending["version"], pending["source"], None, generation):
+                    logger.info(f"Picked up pending schedule {pending['source']}")
+                    return pending
+                continue
+            if delete_if_generation(self.bucket, self.blob_name, generation):
+                logger.info(f"Released lease gs://{self.bucket}/{self.blob_name}")
+                self._held(False)
+                return None
+
+    def expire(self):
+        """Give up the lease early (e.g. after a crash) but keep any pending input for the next run."""
+        self._held(False)
+        data, generation = read_json_generation(self.bucket, self.blob_name)
+        if data and data.get("holder") == self.holder:
+            data["expires_at"] = 0
+            write_json_if_generation(self.bucket, self.blob_name, data, generation)
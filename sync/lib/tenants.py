@@ -0,0 +1,132 @@
+# lib/tenants.py
+"""
+Multi-tenant manifest + sharding across Cloud Run task indexes.
+
+Manifest (JSON in GCS), either a list or {"tenants": [...]}:
+  [{"id": "alice", "krowd_secret": "...", "google_token_secret": "...", "calendar_summary": "OG"}, ...]
+
+Tenants are assigned to shards with rendezvous hashing on the tenant id, so a tenant
+always lands on the same task for a given task count, and only ~1/N tenants move when
+the count changes. Set CLOUD_RUN_TASK_INDEX / CLOUD_RUN_TASK_COUNT locally to see
+which tenants a task would pick up.
+
+run_shard is the shared --tenants entry point of the scraper and sync jobs: it loads the
+manifest, runs this task's tenants and records their results for the workflow.
+"""
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lib.gcs import download_json, upload_json
+
+logger = logging.getLogger("tenants")
+
+RESULTS_PREFIX = "results"
+
+
+def parse_gcs_path(gcs_path: str) -> Optional[Tuple[str, str]]:
+    if not gcs_path.startswith("gs://"):
+        return None
+    parts = gcs_path[5:].split("/", 1)
+    return parts[0], parts[1] if len(parts) > 1 else ""
+
+
+def load_manifest(gcs_path: str) -> Optional[List[Dict[str, Any]]]:
+    parsed = parse_gcs_path(gcs_path)
+    if not parsed:
+        logger.error("Tenant manifest path must start with gs://")
+        return None
+    data = download_json(bucket_name=parsed[0], blob_name=parsed[1])
+    if data is None:
+        return None
+    tenants = data.get("tenants", []) if isinstance(data, dict) else data
+    for t in tenants:
+        if not t.get("id"):
+            logger.error(f"Tenant entry without id in manifest: {t}")
+            return None
+    return tenants
+
+
+def task_shard() -> Tuple[int, int]:
+    """(index, count) for this Cloud Run task; (0, 1) when not running as a job task."""
+    index = int(os.getenv("CLOUD_RUN_TASK_INDEX", "0"))
+    count = int(os.getenv("CLOUD_RUN_TASK_COUNT", "1"))
+    return index, max(count, 1)
+
+
+def shard_for(tenant_id: str, count: int) -> int:
+    def score(shard: int) -> int:
+        return int(hashlib.sha256(f"{tenant_id}:{shard}".encode("utf-8")).hexdigest()[:16], 16)
+    return max(range(count), key=score)
+
+
+def select_tenants(tenants: List[Dict[str, Any]], index: int, count: int) -> List[Dict[str, Any]]:
+    return [t for t in tenants if shard_for(t["id"], count) == index]
+
+
+def run_bounded(fn: Callable[[Dict[str, Any]], Dict[str, Any]], tenants: List[Dict[str, Any]],
+                max_workers: int) -> List[Dict[str, Any]]:
+    """Run fn per tenant with at most max_workers in flight. A crash is recorded, not raised."""
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(fn, t): t["id"] for t in tenants}
+        for fut in as_completed(futures):
+            tenant_id = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:
+                logger.exception(f"Tenant {tenant_id} failed.")
+                result = {"status": "error", "error": str(e)}
+            results.append({"tenant": tenant_id, **result})
+    return sorted(results, key=lambda r: r["tenant"])
+
+
+def write_shard_results(bucket: str, run_id: str, job: str, index: int, count: int,
+                        results: List[Dict[str, Any]]) -> str:
+    blob_name = f"{RESULTS_PREFIX}/{run_id}/{job}/shard-{index:04d}-of-{count:04d}.json"
+    upload_json(bucket_name=bucket, blob_name=blob_name, data={
+        "job": job,
+        "shard": index,
+        "shard_count": count,
+        "tenants": len(results),
+        "failed": sum(1 for r in results if r.get("status") != "success"),
+        "results": results,
+    })
+    return f"gs://{bucket}/{blob_name}"
+
+
+def run_shard(args, job: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]], date_str: str) -> int:
+    """
+    Run fn for this task's tenants (args.tenants, bucket, concurrency, run_id, dry_run) and
+    write results/<run_id>/<job>/shard-*.json. Returns the process exit code.
+    """
+    tenants = load_manifest(args.tenants)
+    if tenants is None:
+        logger.critical("Failed to load tenant manifest.")
+        return 1
+
+    index, count = task_shard()
+    mine = select_tenants(tenants, index, count)
+    logger.info(f"Task {index}/{count}: {len(mine)} of {len(tenants)} tenants")
+    if args.dry_run:
+        print(json.dumps({"shard": index, "shard_count": count, "tenants": [t["id"] for t in mine]}))
+        return 0
+
+    if not args.bucket:
+        logger.critical("--bucket is required with --tenants.")
+        return 1
+
+    results = run_bounded(fn, mine, args.concurrency)
+    run_id = args.run_id or os.getenv("CLOUD_RUN_EXECUTION") or date_str
+    results_path = write_shard_results(args.bucket, run_id, job, index, count, results)
+    failed = sum(1 for r in results if r.get("status") != "success")
+    print(json.dumps({"status": "success" if not failed else "partial", "results_path": results_path,
+                      "tenants": len(results), "failed": failed}))
+    # Per-tenant failures are recorded in the shard results and summed by the workflow,
+    # which fails the run if any tenant failed; failing the task would make Cloud Run
+    # retry every tenant in the shard and stop the workflow before aggregation. Only
+    # task-level errors exit non-zero.
+    return 0
@@ -2,12 +2,40 @@
 """
 sync.py
 Cloud Run Job: read schedule JSON from GCS and sync to Google Calendar.
+Schedules may be a JSON array (*.json) or streamed NDJSON (*.ndjson, *.ndjson.gz).
 Inputs:
   Either:
     --gcs_path gs://bucket/single/YYYY/MM/DD/schedule-<ts>.json
   Or:
     --bucket BUCKET_NAME --date YYYY-MM-DD
   (sync will pick the latest schedule file under that date prefix)
+  Or:
+    --tenants gs://bucket/tenants.json --bucket BUCKET_NAME [--date YYYY-MM-DD]
+  (each Cloud Run task syncs its shard of the manifest, picking the latest file under
+   tenants/<id>/single/YYYY/MM/DD/, and writes results/<run_id>/sync/shard-*.json)
+  Or:
+    --bucket BUCKET_NAME --from YYYY-MM-DD --to YYYY-MM-DD
+  (backfill: one listing of single/ for the range, latest snapshot per week, final event
+   set applied in week-partitioned parallel chunks; events are only deleted in weeks that
+   have a snapshot of their own. The range must end before the current week, which belongs
+   to the regular, leased sync. With --sink ics|both the range is written to --ics_blob,
+   which must not be the live feed)
+
+A regular sync only touches events from the Monday of its snapshot's week onward.
+
+--sink picks the output: "calendar" (Google Calendar API, default), "ics" (an RFC 5545 feed
+written to gs://<bucket>/[tenants/<id>/]feeds/<calendar>.ics, no Calendar API calls) or "both".
+With --ics_weeks N the feed covers the last N weeks of archived snapshots plus the current one.
+The returned feed url is stable: the public object url with --ics_public, otherwise the
+authenticated storage.cloud.google.com url. --ics_signed_days N returns a V4 signed url
+instead, which expires after N days (7 at most) and changes on every run.
+
+Runs for the same (calendar, schedule week) take a lease at gs://<bucket>/leases/...; a run
+whose schedule is not newer than the holder's exits with "coalesced": true.
+
+The planned calendar ops are journaled to gs://<bucket>/journals/<calendar>/<blob>.journal.json
+before anything runs, so a retry of the same schedule only replays unfinished ops. The
+journal is deleted once every op has succeeded.
 """
 
 import argparse
@@ -15,19 +43,29 @@ import json
 import logging
 import os
 import sys
-from datetime import datetime
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
 
 from google.cloud import storage
 
-from lib.gcs import download_json
+from lib.gcs import get_generation, iter_schedule
 from lib.secrets import get_secret
 from lib.google_calendar import (
     build_service_from_token_info,
     find_calendar_by_summary,
-    delete_events,
-    create_events,
+    RateLimited,
+    list_events,
+    local_date,
+    compact_shifts,
 )
+from lib.history import latest_weekly_snapshots, merge_snapshots, shift_date, snapshot_date, week_monday
+from lib.ics import publish_ics
+from lib.journal import Journal, apply_op, delete_superseded, journal_blob_name, plan_ops
+from lib.lease import ACQUIRED, HANDED_OFF, Lease, install_sigterm_handler, lease_blob_name
+from lib.tenants import parse_gcs_path, run_shard
 
 logger = logging.getLogger("sync")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -41,10 +79,23 @@ def parse_args():
     p.add_argument("--date", help="YYYY-MM-DD (default today). Used with --bucket")
     p.add_argument("--google_token_secret", help="Secret id containing token.json", default=os.getenv("GOOGLE_TOKEN_SECRET"))
     p.add_argument("--calendar_summary", help="Calendar summary to sync into", default=DEFAULT_CALENDAR_SUMMARY)
+    p.add_argument("--tenants", help="gs:// path to a tenant manifest (multi-tenant mode)", default=os.getenv("TENANTS_MANIFEST"))
+    p.add_argument("--run_id", help="Id grouping shard results of one workflow run", default=os.getenv("RUN_ID"))
+    p.add_argument("--concurrency", type=int, help="Tenants synced in parallel per task", default=int(os.getenv("TENANT_CONCURRENCY", "4")))
+    p.add_argument("--dry_run", action="store_true", help="Print this task's tenant shard and exit")
+    p.add_argument("--sink", choices=["calendar", "ics", "both"], help="Where to write the schedule", default=os.getenv("SYNC_SINK", "calendar"))
+    p.add_argument("--ics_blob", help="Blob name for the .ics feed (default [tenants/<id>/]feeds/<calendar>.ics; not with --tenants; required for a backfill to ics)", default=os.getenv("ICS_BLOB"))
+    p.add_argument("--ics_weeks", type=int, help="Past weeks of stored history to include in the feed (0 = current schedule only)", default=int(os.getenv("ICS_WEEKS", "0")))
+    p.add_argument("--ics_public", action="store_true", help="Make the feed publicly readable (stable storage.googleapis.com url)")
+    p.add_argument("--ics_signed_days", type=int, help="Return a V4 signed feed url valid this many days (1-7; the url changes every run). 0 = stable authenticated url", default=int(os.getenv("ICS_SIGNED_DAYS", "0")))
+    p.add_argument("--lease_wait", type=int, help="Seconds to wait for a lease held by an older schedule (0 = hand our input to the holder)", default=int(os.getenv("LEASE_WAIT_SECONDS", "0")))
+    p.add_argument("--from", dest="date_from", help="Backfill start YYYY-MM-DD (with --to and --bucket)")
+    p.add_argument("--to", dest="date_to", help="Backfill end YYYY-MM-DD, inclusive; must be before the current week")
+    p.add_argument("--workers", type=int, help="Parallel week chunks during backfill", default=int(os.getenv("BACKFILL_WORKERS", "4")))
     return p.parse_args()
 
 
-def resolve_latest_blob(bucket: str, date_str: str) -> Optional[str]:
+def resolve_latest_blob(bucket: str, date_str: str, root: str = "single/") -> Optional[str]:
     """Find the latest schedule blob for a given bucket + date."""
     try:
         date_obj = datetime.strptime(date_str, "%Y-%m-%d")
@@ -52,7 +103,7 @@ def resolve_latest_blob(bucket: str, date_str: str) -> Optional[str]:
         logger.critical("Invalid date format. Use YYYY-MM-DD.")
         return None
 
-    prefix = f"single/{date_obj.strftime('%Y/%m/%d')}/"
+    prefix = f"{root}{date_obj.strftime('%Y/%m/%d')}/"
     logger.info(f"Looking for schedule files under gs://{bucket}/{prefix}")
 
     client = storage.Client()
@@ -68,10 +119,344 @@ def resolve_latest_blob(bucket: str, date_str: str) -> Optional[str]:
     return latest_blob.name
 
 
+def _error(msg: str) -> Dict[str, Any]:
+    logger.critical(msg)
+    return {"status": "error", "error": msg}
+
+
+def load_shifts(bucket: str, blob: str) -> Optional[List[Dict]]:
+    """
+    Stream a schedule blob (*.json or *.ndjson[.gz]) down to compact {"start", "end"} shifts.
+    Full Krowd records are dropped as they are read, so only the compact list is kept.
+    """
+    records = iter_schedule(bucket, blob)
+    if records is None:
+        return None
+    return compact_shifts(records)
+
+
+def event_date(ev: Dict) -> str:
+    """YYYY-MM-DD of an event's start in TIME_ZONE ("" if it has none)."""
+    day = local_date(ev.get("start", {}).get("dateTime") or ev.get("start", {}).get("date"))
+    return day.isoformat() if day else ""
+
+
+def events_from(events: List[Dict], first: date, last: Optional[date] = None) -> List[Dict]:
+    # timeMin/timeMax are UTC and match on overlap; trim to local start dates in [first, last]
+    lo, hi = first.isoformat(), (last or date.max).isoformat()
+    return [ev for ev in events if lo <= event_date(ev) <= hi]
+
+
+def sync_calendar(bucket: str, blob: str, schedule: List[Dict], google_token_secret: str,
+                  calendar_summary: str, window_start: date, root: str = "single/",
+                  keep_alive: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """
+    Sync one schedule into one Google Calendar. Returns the JSON-able result.
+    Only events from window_start (the Monday the snapshot is authoritative from) are
+    considered, so earlier weeks, e.g. restored by a backfill, are left alone.
+    """
+    # token_info = load_secret_json(args.google_token_secret)
+    token_info = get_secret(google_token_secret)
+    service = build_service_from_token_info(token_info=token_info)
+    if not service:
+        return _error("Failed to initialize Google Calendar service.")
+
+    calendar_id = find_calendar_by_summary(service, calendar_summary)
+    if not calendar_id:
+        return _error(f"Calendar with summary '{calendar_summary}' not found.")
+
+    journal_name = journal_blob_name(calendar_summary, blob)
+    journal = Journal.load(bucket, journal_name)
+    if journal and journal.data.get("calendar_id") == calendar_id:
+        logger.info(f"Resuming from journal gs://{bucket}/{journal_name} ({len(journal.pending)} ops pending)")
+    else:
+        # Plan against the current calendar state and record it before executing anything
+        logger.info("Fetching existing events to plan sync...")
+        existing = events_from(
+            list_events(service, calendar_id, q=calendar_summary, time_min=f"{window_start}T00:00:00Z"),
+            window_start,
+        )
+        ops = plan_ops(calendar_id, schedule, existing)
+        journal = Journal.create(bucket, journal_name, calendar_id, f"gs://{bucket}/{blob}", ops)
+        logger.info(f"Journaled {len(ops)} ops to gs://{bucket}/{journal_name}")
+
+    stats = journal.run(service, keep_alive=keep_alive)
+    if stats["aborted"]:
+        return {"status": "error", "error": "Lost the sync lease; rerun to resume.", **stats}
+    if stats["rate_limited"]:
+        logger.critical("Sync stopped on Calendar API quota; rerun later to resume.")
+        return {"status": "partial", **stats}
+    if stats["failed"]:
+        logger.critical(f"Sync incomplete: {stats['failed']} ops failed; rerun to resume.")
+        return {"status": "partial", **stats}
+
+    superseded = delete_superseded(bucket, calendar_summary, blob, root)
+    if superseded:
+        logger.info(f"Deleted {superseded} superseded journal(s) for the week")
+    logger.info("Calendar sync complete.")
+    return {"status": "success", "created": stats["upserted"], **stats}
+
+
+def feed_shifts(bucket: str, blob: str, schedule: List[Dict], weeks: int, root: str) -> List[Dict]:
+    """The current schedule, optionally extended back over `weeks` weeks of stored snapshots."""
+    if weeks <= 0:
+        return schedule
+    today = datetime.now().date()
+    window_start = week_monday(today) - timedelta(weeks=weeks)
+    snapshots = []
+    for monday, name in latest_weekly_snapshots(bucket, window_start, today, root=root):
+        shifts = load_shifts(bucket, name)
+        if shifts is None:
+            # Leave the week to the previous snapshot rather than blanking it
+            logger.warning(f"Skipping unreadable snapshot gs://{bucket}/{name}")
+            continue
+        snapshots.append((monday, shifts))
+    # The schedule being synced wins over history from its own week onward
+    snapshots.append((week_monday(snapshot_date(blob, root) or today), schedule))
+    return [s for s in merge_snapshots(snapshots) if (shift_date(s) or window_start) >= window_start]
+
+
+def write_sinks(args, bucket: str, blob: str, schedule: List[Dict], google_token_secret: Optional[str],
+                calendar_summary: str, root: str, keep_alive: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """Write one downloaded schedule to the selected sink(s)."""
+    result: Dict[str, Any] = {"status": "success", "shifts": len(schedule)}
+    if args.sink in ("calendar", "both"):
+        if not google_token_secret:
+            return _error("google_token_secret is required (Secret Manager secret id)")
+        window_start = week_monday(snapshot_date(blob, root) or datetime.now().date())
+        result.update(sync_calendar(bucket, blob, schedule, google_token_secret, calendar_summary, window_start, root,
+                                    keep_alive=keep_alive))
+    if args.sink in ("ics", "both"):
+        ics_blob = args.ics_blob or f"{_tenant_prefix(root)}feeds/{calendar_summary}.ics"
+        shifts = feed_shifts(bucket, blob, schedule, args.ics_weeks, root)
+        result["ics"] = publish_ics(bucket, ics_blob, calendar_summary, shifts, public=args.ics_public,
+                                    signed_days=args.ics_signed_days)
+    return result
+
+
+def _tenant_prefix(root: str) -> str:
+    return root[: -len("single/")] if root.endswith("single/") else ""
+
+
+def sync_schedule(args, bucket: str, blob: str, google_token_secret: Optional[str], calendar_summary: str,
+                  root: str = "single/") -> Dict[str, Any]:
+    """
+    Sync one schedule blob under the (calendar, week) lease. Overlapping runs with an
+    equal-or-older schedule coalesce unless its journal has pending ops; newer ones are handed to the holder and synced
+    by it before the lease is released.
+    """
+    version = get_generation(bucket, blob)
+    if version is None:
+        return _error(f"Schedule not found: gs://{bucket}/{blob}")
+    week = week_monday(snapshot_date(blob, root) or datetime.now().date())
+    lease = Lease(bucket, f"{_tenant_prefix(root)}{lease_blob_name(calendar_summary, week.isoformat())}")
+    # An equal version still counts as work if a previous attempt left journal ops behind
+    journal = Journal.load(bucket, journal_blob_name(calendar_summary, blob)) if args.sink != "ics" else None
+    outcome = lease.acquire(version, f"gs://{bucket}/{blob}", wait=args.lease_wait,
+                            resume=bool(journal and journal.pending))
+    if outcome != ACQUIRED:
+        return {"status": "success", "coalesced": True, "handed_off": outcome == HANDED_OFF}
+
+    sources = []
+    try:
+        while True:
+            if not lease.keep_alive():
+                return {**_error("Lost the sync lease before syncing."), "coalesced": False, "sources": sources}
+            sources.append(f"gs://{bucket}/{blob}")
+            schedule = load_shifts(bucket, blob)
+            if schedule is None:
+                result = _error("Failed to download schedule.")
+            else:
+                result = write_sinks(args, bucket, blob, schedule, google_token_secret, calendar_summary, root,
+                                     keep_alive=lease.keep_alive)
+            pending = lease.release()
+            if not pending:
+                return {**result, "coalesced": False, "sources": sources}
+            bucket, blob = parse_gcs_path(pending["source"])
+            logger.info(f"Syncing handed-over schedule gs://{bucket}/{blob}")
+    except BaseException:
+        lease.expire()
+        raise
+
+
+def _op_week(op: Dict) -> date:
+    day = local_date(op.get("start"))
+    return week_monday(day) if day else date.min
+
+
+def backfill_calendar(token_info: Dict, calendar_summary: str, shifts: List[Dict], start: date, end: date,
+                      covered: Set[date], workers: int) -> Dict[str, Any]:
+    """
+    Apply the final shift set for [start, end] to the calendar in parallel week chunks.
+    `covered` holds the Mondays of weeks that have their own snapshot; events are only
+    deleted in those weeks.
+    """
+    service = build_service_from_token_info(token_info=token_info)
+    if not service:
+        return _error("Failed to initialize Google Calendar service.")
+    calendar_id = find_calendar_by_summary(service, calendar_summary)
+    if not calendar_id:
+        return _error(f"Calendar with summary '{calendar_summary}' not found.")
+
+    # Pad the query by a day each side for time zones, then keep only events dated in range
+    existing = list_events(
+        service, calendar_id, q=calendar_summary,
+        time_min=f"{start - timedelta(days=1)}T00:00:00Z",
+        time_max=f"{end + timedelta(days=2)}T00:00:00Z",
+    )
+    existing = events_from(existing, start, end)
+    # Only weeks backed by a loaded snapshot may lose events; elsewhere we only add
+    ops = [op for op in plan_ops(calendar_id, shifts, existing)
+           if op["op"] != "delete" or _op_week(op) in covered]
+
+    chunks: Dict[date, List[Dict]] = {}
+    for op in ops:
+        chunks.setdefault(_op_week(op), []).append(op)
+    logger.info(f"Backfill plan: {len(ops)} ops across {len(chunks)} weeks ({len(existing)} existing events)")
+
+    # The discovery client is not thread-safe, so every worker builds its own service
+    local = threading.local()
+    lock = threading.Lock()
+    progress = {"weeks": 0, "ops": 0, "failed": 0}
+    rate_limited = threading.Event()
+
+    def run_chunk(monday: date, chunk: List[Dict]) -> None:
+        if not hasattr(local, "service"):
+            local.service = build_service_from_token_info(token_info=token_info)
+        done = failed = 0
+        for op in chunk:
+            if rate_limited.is_set():
+                break
+            try:
+                failed += 0 if apply_op(local.service, calendar_id, op) else 1
+            except RateLimited:
+                # Stop every worker: further calls would only burn more quota
+                rate_limited.set()
+                break
+            done += 1
+        with lock:
+            progress["weeks"] += 1
+            progress["ops"] += done
+            progress["failed"] += failed
+            logger.info(
+                f"Backfill week {monday}: {len(chunk)} ops, {failed} failed "
+                f"[{progress['weeks']}/{len(chunks)} weeks, {progress['ops']}/{len(ops)} ops]"
+            )
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(run_chunk, monday, chunk) for monday, chunk in sorted(chunks.items())]
+        for fut in as_completed(futures):
+            fut.result()
+
+    stats = {
+        "weeks": len(chunks),
+        "deleted": sum(1 for op in ops if op["op"] == "delete"),
+        "upserted": sum(1 for op in ops if op["op"] == "upsert"),
+        "unchanged": len(shifts) - sum(1 for op in ops if op["op"] == "upsert"),
+        "applied": progress["ops"],
+        "failed": progress["failed"],
+    }
+    if rate_limited.is_set():
+        logger.critical(f"Backfill stopped on Calendar API quota after {progress['ops']}/{len(ops)} ops; rerun later to converge.")
+        return {"status": "partial", "rate_limited": 1, **stats}
+    if stats["failed"]:
+        logger.critical(f"Backfill incomplete: {stats['failed']} ops failed; rerun to converge.")
+        return {"status": "partial", **stats}
+    return {"status": "success", **stats}
+
+
+def run_backfill(args) -> int:
+    if not args.bucket or not args.date_from or not args.date_to:
+        logger.critical("Backfill needs --bucket, --from and --to.")
+        return 1
+    try:
+        start = datetime.strptime(args.date_from, "%Y-%m-%d").date()
+        end = datetime.strptime(args.date_to, "%Y-%m-%d").date()
+    except ValueError:
+        logger.critical("Invalid date format. Use YYYY-MM-DD.")
+        return 1
+    if end < start:
+        logger.critical("--to must not be before --from.")
+        return 1
+    # Backfill takes no leases, so it stays out of weeks the regular sync may be writing
+    current_week = week_monday(datetime.now().date())
+    if end >= current_week:
+        logger.critical(f"Backfill must end before the current week ({current_week}); use the regular sync for it.")
+        return 1
+    if args.sink != "ics" and not args.google_token_secret:
+        logger.critical("google_token_secret is required (Secret Manager secret id)")
+        return 1
+    # The feed would only hold [from, to], so it must not replace the live one
+    live_feed = f"feeds/{args.calendar_summary}.ics"
+    if args.sink in ("ics", "both") and (not args.ics_blob or args.ics_blob == live_feed):
+        logger.critical(f"Backfill with --sink {args.sink} needs an --ics_blob other than the live feed {live_feed}.")
+        return 1
+
+    began = time.monotonic()
+    snapshots = latest_weekly_snapshots(args.bucket, start, end)
+    logger.info(f"Backfill {start}..{end}: {len(snapshots)} weekly snapshots")
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        schedules = list(pool.map(lambda item: load_shifts(args.bucket, item[1]), snapshots))
+    missing = [name for (_, name), shifts in zip(snapshots, schedules) if shifts is None]
+    if missing:
+        logger.critical(f"Failed to load {len(missing)} snapshot(s): {', '.join(missing)}")
+        return 1
+    covered = {monday for monday, _ in snapshots}
+    shifts = [
+        s for s in merge_snapshots(zip((monday for monday, _ in snapshots), schedules))
+        if start <= (shift_date(s) or date.min) <= end
+    ]
+
+    result: Dict[str, Any] = {"status": "success", "from": str(start), "to": str(end),
+                              "snapshots": len(snapshots), "shifts": len(shifts)}
+    if args.sink in ("calendar", "both"):
+        token_info = get_secret(args.google_token_secret)
+        result.update(backfill_calendar(token_info, args.calendar_summary, shifts, start, end, covered, args.workers))
+    if args.sink in ("ics", "both"):
+        result["ics"] = publish_ics(args.bucket, args.ics_blob, args.calendar_summary, shifts, public=args.ics_public,
+                                    signed_days=args.ics_signed_days)
+
+    result["elapsed_s"] = round(time.monotonic() - began, 1)
+    print(json.dumps(result))
+    return 0 if result["status"] == "success" else 1
+
+
+def run_tenants(args) -> int:
+    if args.ics_blob:
+        logger.critical("--ics_blob/ICS_BLOB cannot be used with --tenants; feeds go to tenants/<id>/feeds/.")
+        return 1
+    date_str = args.date or datetime.now().strftime("%Y-%m-%d")
+
+    def sync_tenant(tenant: Dict[str, Any]) -> Dict[str, Any]:
+        token_secret = tenant.get("google_token_secret") or args.google_token_secret
+        root = f"tenants/{tenant['id']}/single/"
+        blob = resolve_latest_blob(args.bucket, date_str, root=root)
+        if not blob:
+            return _error(f"No schedule for tenant {tenant['id']} on {date_str}.")
+        calendar_summary = tenant.get("calendar_summary") or args.calendar_summary
+        return sync_schedule(args, args.bucket, blob, token_secret, calendar_summary, root=root)
+
+    return run_shard(args, "sync", sync_tenant, date_str)
+
+
 def main():
     args = parse_args()
+    install_sigterm_handler()
+
+    if not 0 <= args.ics_signed_days <= 7:
+        logger.critical("--ics_signed_days must be between 0 and 7 (V4 signed url limit)")
+        sys.exit(1)
 
-    if not args.google_token_secret:
+    if args.tenants:
+        if args.date_from or args.date_to:
+            logger.critical("--from/--to cannot be combined with --tenants.")
+            sys.exit(1)
+        sys.exit(run_tenants(args))
+
+    if args.date_from or args.date_to:
+        sys.exit(run_backfill(args))
+
+    if args.sink != "ics" and not args.google_token_secret:
         logger.critical("google_token_secret is required (Secret Manager secret id)")
         sys.exit(1)
 
@@ -79,12 +464,11 @@ def main():
     blob = None
 
     if args.gcs_path:
-        if not args.gcs_path.startswith("gs://"):
+        parsed = parse_gcs_path(args.gcs_path)
+        if not parsed:
             logger.critical("gcs_path must start with gs://")
             sys.exit(1)
-        parts = args.gcs_path[5:].split("/", 1)
-        bucket = parts[0]
-        blob = parts[1] if len(parts) > 1 else ""
+        bucket, blob = parsed
     else:
         if not args.bucket:
             logger.critical("Must provide either --gcs_path or --bucket.")
@@ -95,36 +479,11 @@ def main():
             sys.exit(1)
         bucket = args.bucket
 
-    schedule = download_json(bucket_name=bucket, blob_name=blob)
-    if schedule is None:
-        logger.critical("Failed to download schedule JSON.")
+    result = sync_schedule(args, bucket, blob, args.google_token_secret, args.calendar_summary)
+    print(json.dumps(result))
+    if result["status"] != "success":
         sys.exit(1)
 
-    # token_info = load_secret_json(args.google_token_secret)
-    token_info = get_secret(args.google_token_secret)
-    service = build_service_from_token_info(token_info=token_info)
-    if not service:
-        logger.critical("Failed to initialize Google Calendar service.")
-        sys.exit(1)
-
-    calendar_id = find_calendar_by_summary(service, args.calendar_summary)
-    if not calendar_id:
-        logger.critical(f"Calendar with summary '{args.calendar_summary}' not found.")
-        sys.exit(1)
-
-    # Delete old events
-    logger.info("Fetching existing events to delete...")
-    events_to_delete = service.events().list(
-        calendarId=calendar_id, q=args.calendar_summary, singleEvents=True
-    ).execute().get("items", [])
-    delete_events(service, calendar_id, events_to_delete)
-
-    # Create new events
-    create_events(service, calendar_id, schedule)
-
-    logger.info("Sync complete.")
-    print(json.dumps({"status": "success", "created": len(schedule)}))
-
 
 if __name__ == "__main__":
     main()